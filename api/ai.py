@@ -1,6 +1,5 @@
 import os
 from openai import OpenAI
-from sentence_transformers import SentenceTransformer
 from typing import Protocol
 import numpy.typing as npt
 import numpy as np
@@ -13,12 +12,24 @@ class EmbeddingMaker(Protocol):
         ...
 
 
+def make_embedder() -> EmbeddingMaker:
+    # with the embedding service running, workers don't load the model at all
+    if config.embedding_socket_path:
+        from .embedding_service import RemoteEmbedder
+
+        return RemoteEmbedder(config.embedding_socket_path, config.embedding_timeout_s)
+
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(config.model_name)
+
+
 class AI:
     def __init__(self) -> None:
         self.client: OpenAI = OpenAI(
             api_key=os.environ["OPENAI_API_KEY"],
         )
-        self.embedder: EmbeddingMaker = SentenceTransformer(config.model_name)
+        self.embedder: EmbeddingMaker = make_embedder()
       
     def encode(self, text: str) -> npt.NDArray[np.float32]:
         return self.embedder.encode(text)
@@ -1,6 +1,7 @@
 import hashlib
-from typing import List, Optional
+from typing import Dict, List, Optional
 from fastapi import FastAPI, HTTPException, UploadFile, File, Header, BackgroundTasks, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from uuid import uuid4
@@ -8,7 +9,8 @@ import calendar
 import time
 import os
 import logging
-from config import db_path, data_root_path, data_file_name, index_file_name
+import threading
+from config import db_path, data_root_path, data_file_name, index_file_name, compaction_interval_s
 from . import models, utils
 from .ai import AI
 
@@ -20,6 +22,15 @@ logging.basicConfig(level=logging.INFO)
 ai = AI()
 app = FastAPI()
 
+# Cancellation flags of ingestion tasks that are still running, keyed by doc_id
+pending_tasks: Dict[str, threading.Event] = {}
+pending_tasks_lock = threading.Lock()
+
+# compaction only catches directories leaked by interrupted ingestion, so it
+# runs at most once per interval and never concurrently within a worker
+compaction_lock = threading.Lock()
+last_compaction: Optional[float] = None
+
 # List of allowed origins
 origins = [
     "http://localhost:8001"
@@ -60,6 +71,7 @@ class DeleteRequest(BaseModel):
 
 class DeleteResponse(BaseModel):
     detail: str
+    bytes_freed: int = 0
 
 class PaginatedDocumentsResponse(BaseModel):
     documents: List[models.DocRow]
@@ -104,44 +116,117 @@ async def add_pdf(
         if doc.state == models.DocumentState.INDEX_BUILT:
             return AddFileResponse(sourceId=doc_id)
         else:
-            background_task.add_task(file_task, doc_id, file.filename, data)
+            add_file_task(background_task, doc_id, file.filename, data)
     else:
-        background_task.add_task(file_task, doc_id, file.filename, data)
+        add_file_task(background_task, doc_id, file.filename, data)
     return AddFileResponse(sourceId=doc_id)
 
 
-def file_task(doc_id: str, doc_name: str, data: bytes):
-    if not models.Doc.exists_with_doc_id(db_path, doc_id):
-        return
+def add_file_task(
+    background_task: BackgroundTasks, doc_id: str, doc_name: str, data: bytes
+):
+    cancelled = threading.Event()
+    with pending_tasks_lock:
+        previous = pending_tasks.get(doc_id)
+        if previous is not None:
+            # a newer upload supersedes the one still running
+            previous.set()
+        pending_tasks[doc_id] = cancelled
+    background_task.add_task(file_task, doc_id, doc_name, data, cancelled)
 
-    doc_source = models.DocSource(
-        doc_path=data_root_path / doc_id,
-        file_name=doc_name,
-    )
-    doc_source.save_doc(data)
-    models.Doc.update_state_with_doc_id(db_path, doc_id, models.DocumentState.UPLOADED)
 
-    chunks = utils.process_doc(doc_source, data)
-    models.Doc.update_state_with_doc_id(db_path, doc_id, models.DocumentState.PROCESSED)
+def cancel_file_task(doc_id: str) -> None:
+    with pending_tasks_lock:
+        cancelled = pending_tasks.pop(doc_id, None)
+    if cancelled is not None:
+        cancelled.set()
 
-    utils.create_store(doc_source, ai, chunks)
-    models.Doc.update_state_with_doc_id(
-        db_path, doc_id, models.DocumentState.INDEX_BUILT
-    )
+
+def file_task(doc_id: str, doc_name: str, data: bytes, cancelled: threading.Event):
+    def is_cancelled() -> bool:
+        # the event only reaches this process, a delete handled by another
+        # worker shows up as the docs row being gone
+        return cancelled.is_set() or not models.Doc.exists_with_doc_id(db_path, doc_id)
+
+    try:
+        if is_cancelled():
+            return
+
+        doc_source = models.DocSource(
+            doc_path=data_root_path / doc_id,
+            file_name=doc_name,
+        )
+        doc_source.save_doc(data)
+        models.Doc.update_state_with_doc_id(db_path, doc_id, models.DocumentState.UPLOADED)
+        if is_cancelled():
+            return
+
+        chunks = utils.process_doc(doc_source, data)
+        models.Doc.update_state_with_doc_id(db_path, doc_id, models.DocumentState.PROCESSED)
+        if is_cancelled():
+            return
+
+        if not utils.create_store(doc_source, ai, chunks, is_cancelled):
+            return
+        models.Doc.update_state_with_doc_id(
+            db_path, doc_id, models.DocumentState.INDEX_BUILT
+        )
+    except OSError:
+        # the document directory may be removed underneath a cancelled task
+        if not is_cancelled():
+            raise
+    finally:
+        with pending_tasks_lock:
+            if pending_tasks.get(doc_id) is cancelled:
+                del pending_tasks[doc_id]
+        if not models.Doc.exists_with_doc_id(db_path, doc_id):
+            logger.info(f"Ingestion of {doc_id} cancelled")
+            utils.remove_doc_path(data_root_path / doc_id)
+
+
+def compact_task():
+    global last_compaction
+    if not compaction_lock.acquire(blocking=False):
+        return
+    try:
+        now = time.monotonic()
+        if last_compaction is not None and now - last_compaction < compaction_interval_s:
+            return
+        last_compaction = now
+        with pending_tasks_lock:
+            active = set(pending_tasks)
+        utils.compact_data_root(db_path, data_root_path, active)
+    finally:
+        compaction_lock.release()
+
+
+def delete_source(doc_id: str) -> int:
+    cancel_file_task(doc_id)
+    if models.Doc.exists_with_doc_id(db_path, doc_id):
+        models.Doc.delete_with_doc_id(db_path, doc_id)
+    return utils.remove_doc_path(data_root_path / doc_id)
 
 
 @app.post("/v1/sources/delete", response_model=DeleteResponse)
 async def delete_pdf(
-    delete_request: DeleteRequest, x_api_key: Optional[str] = Header(None)
+    delete_request: DeleteRequest,
+    background_task: BackgroundTasks,
+    x_api_key: Optional[str] = Header(None),
 ):
     if x_api_key != os.environ.get("API_KEY"):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     for source_id in delete_request.sources:
-        if models.Doc.exists_with_doc_id(db_path, source_id):
-            models.Doc.delete_with_doc_id(db_path, source_id)
+        if not models.doc_id_pattern.fullmatch(source_id):
+            raise HTTPException(status_code=400, detail=f"Invalid source id {source_id}")
+
+    bytes_freed = 0
+    for source_id in delete_request.sources:
+        bytes_freed += await run_in_threadpool(delete_source, source_id)
 
-    return DeleteResponse(detail="success")
+    # reclaim directories left behind by earlier deletes or interrupted ingestion
+    background_task.add_task(compact_task)
+    return DeleteResponse(detail="success", bytes_freed=bytes_freed)
 
 
 @app.post("/v1/chats/message", response_model=ChatResponse)
@@ -0,0 +1,210 @@
+"""Local embedding service shared by all API workers.
+
+Loads the SentenceTransformer once and serves encode requests over a unix
+socket. Requests arriving from different workers within a short window are
+encoded together as one batch.
+
+Run it before starting the workers, pointing both at the same socket:
+
+    EMBEDDING_SOCKET_PATH=/tmp/doc_search_embed.sock python -m api.embedding_service
+    EMBEDDING_SOCKET_PATH=/tmp/doc_search_embed.sock uvicorn api.app:app --workers 4
+
+The socket is only accessible to the user running the service, so run the
+workers as the same user.
+
+Wire format: every message is a 4-byte big-endian length followed by the
+payload. Requests carry UTF-8 text, responses carry the embedding as
+little-endian float32. An empty response means encoding failed.
+"""
+import asyncio
+import logging
+import os
+import socket
+import struct
+import threading
+from typing import Any, List, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+import config
+
+logger = logging.getLogger(__name__)
+
+header = struct.Struct(">I")
+
+
+def read_message(sock: socket.socket) -> bytes:
+    (size,) = header.unpack(recv_exactly(sock, header.size))
+    return recv_exactly(sock, size)
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("embedding service closed the connection")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+class RemoteEmbedder:
+    """EmbeddingMaker that forwards encode calls to the embedding service."""
+
+    def __init__(self, socket_path: str, timeout: float) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        # one connection per thread, requests on a connection are sequential
+        self.local = threading.local()
+
+    def connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # a stalled service must not pin the worker's threadpool forever
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def encode(self, text: str) -> npt.NDArray[np.float32]:
+        payload = text.encode("utf-8")
+        for attempt in range(2):
+            sock = getattr(self.local, "sock", None)
+            if sock is None:
+                sock = self.local.sock = self.connect()
+            try:
+                sock.sendall(header.pack(len(payload)) + payload)
+                response = read_message(sock)
+                break
+            except socket.timeout:
+                # the late response would arrive on this connection, drop it
+                sock.close()
+                self.local.sock = None
+                raise
+            except OSError:
+                # stale connection, e.g. the service was restarted
+                sock.close()
+                self.local.sock = None
+                if attempt == 1:
+                    raise
+        if not response:
+            raise RuntimeError("embedding service failed to encode text")
+        return np.frombuffer(response, dtype="<f4").astype(np.float32)
+
+
+class EmbeddingService:
+    def __init__(self, model: Any, max_batch_size: int, max_batch_wait_ms: float) -> None:
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait_ms / 1000
+        self.queue: "asyncio.Queue[Tuple[str, asyncio.Future]]" = asyncio.Queue()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                (size,) = header.unpack(await reader.readexactly(header.size))
+                text = (await reader.readexactly(size)).decode("utf-8")
+                future = loop.create_future()
+                await self.queue.put((text, future))
+                try:
+                    embedding: bytes = await future
+                except Exception:
+                    logger.exception("failed to encode text")
+                    embedding = b""
+                writer.write(header.pack(len(embedding)) + embedding)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # the worker went away, e.g. it was restarted mid-request
+            pass
+        finally:
+            writer.close()
+
+    async def next_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        if self.queue.empty():
+            # a lone caller, e.g. ingestion encoding chunk after chunk, should
+            # not pay for the batch window on every call
+            return batch
+
+        deadline = loop.time() + self.max_batch_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await loop.run_in_executor(
+                    None,
+                    lambda: self.model.encode(texts, batch_size=self.max_batch_size),
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            logger.debug(f"Encoded batch of {len(batch)}")
+            for (_, future), embedding in zip(batch, embeddings):
+                # the waiting connection may have been cancelled meanwhile
+                if not future.done():
+                    future.set_result(np.asarray(embedding, dtype="<f4").tobytes())
+
+    async def serve(self, socket_path: str) -> None:
+        remove_stale_socket(socket_path)
+        # only the owner may connect, the umask covers the window between
+        # bind and any chmod
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(
+                self.handle_connection, path=socket_path
+            )
+        finally:
+            os.umask(umask)
+        logger.info(f"Embedding service listening on {socket_path}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_batches())
+
+
+def remove_stale_socket(socket_path: str) -> None:
+    if not os.path.exists(socket_path):
+        return
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except ConnectionRefusedError:
+        # left behind by a service that is no longer running
+        os.remove(socket_path)
+        return
+    finally:
+        sock.close()
+    raise RuntimeError(f"An embedding service is already listening on {socket_path}")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    if not config.embedding_socket_path:
+        raise SystemExit("EMBEDDING_SOCKET_PATH is not set")
+    from sentence_transformers import SentenceTransformer
+
+    service = EmbeddingService(
+        SentenceTransformer(config.model_name),
+        config.embedding_max_batch_size,
+        config.embedding_max_batch_wait_ms,
+    )
+    asyncio.run(service.serve(config.embedding_socket_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,51 @@ from pathlib import Path
 from dataclasses import dataclass
 from enum import IntEnum
 import logging
-from typing import List, Optional, Tuple
+import re
+from typing import List, Optional, Set, Tuple
 from config import data_file_name, index_file_name, block_size
 
 logger = logging.getLogger(__name__)
 
+# doc_ids are "ch_" followed by the md5 hex digest of the uploaded file
+doc_id_pattern = re.compile(r"ch_[0-9a-f]{32}")
+
+table_creation_queries = [
+    """
+    CREATE TABLE IF NOT EXISTS docs
+    (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        uid       INTEGER NOT NULL DEFAULT 0,
+        doc_id    TEXT    NOT NULL UNIQUE DEFAULT '',
+        doc_name  TEXT    NOT NULL DEFAULT '',
+        doc_type  TEXT    NOT NULL DEFAULT '',
+        state     INTEGER NOT NULL DEFAULT 0,
+        size      INTEGER NOT NULL DEFAULT 0,
+        create_at INTEGER NOT NULL DEFAULT 0,
+        update_at INTEGER NOT NULL DEFAULT 0
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS messages
+    (
+        id        INTEGER PRIMARY KEY AUTOINCREMENT,
+        uid       INTEGER NOT NULL DEFAULT 0,
+        doc_id    TEXT    NOT NULL DEFAULT '',
+        role      TEXT    NOT NULL DEFAULT '',
+        content   TEXT    NOT NULL DEFAULT '',
+        create_at INTEGER NOT NULL
+    );
+    """
+]
+
+
+def create_tables(db_path: Path) -> None:
+    with sqlite3.connect(db_path) as conn:
+        cur = conn.cursor()
+        for query in table_creation_queries:
+            cur.execute(query)
+        conn.commit()
+
 
 class DocumentState(IntEnum):
     DEFAULT = 0
@@ -198,6 +238,12 @@ class Doc(BaseModel):
             cursor.execute(query, (doc_id,))
             conn.commit()
     
+    @classmethod
+    def get_all_doc_ids(cls, db_path: Path) -> Set[str]:
+        with sqlite3.connect(db_path) as conn:
+            rows = conn.execute("SELECT doc_id FROM docs").fetchall()
+            return {row[0] for row in rows}
+
     @classmethod
     def get_documents(cls, db_path: Path, page: int, page_size: int) -> Tuple[List['Doc'], int]:
         offset = (page - 1) * page_size
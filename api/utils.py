@@ -1,5 +1,8 @@
 import io
+import os
 import re
+import threading
+from collections import OrderedDict
 import faiss
 import logging
 import json
@@ -7,9 +10,10 @@ import numpy as np
 import numpy.typing as npt
 from PyPDF2 import PdfReader
 from semantic_text_splitter import CharacterTextSplitter
-from config import min_characters, max_characters, k, threshold
-from typing import Protocol, List, Set, Tuple
-from .models import DocSource
+from config import min_characters, max_characters, k, threshold, index_cache_size, data_root_path
+from pathlib import Path
+from typing import Callable, Protocol, List, Set, Tuple
+from .models import Doc, DocSource, doc_id_pattern
 
 logger = logging.getLogger()
 logging.basicConfig(level=logging.INFO)
@@ -104,8 +108,15 @@ def process_doc(doc_source: DocSource, data: bytes) -> List[str]:
     return chunks
 
 
-def create_store(doc_source: DocSource, ai: AI, chunks: List[str]) -> None:
-    embeddings = [ai.encode(chunk) for chunk in chunks]
+def create_store(
+    doc_source: DocSource, ai: AI, chunks: List[str], is_cancelled: Callable[[], bool]
+) -> bool:
+    """Embed the chunks and save their index, returns False if cancelled midway."""
+    embeddings = []
+    for chunk in chunks:
+        if is_cancelled():
+            return False
+        embeddings.append(ai.encode(chunk))
     index = faiss.IndexFlatL2(len(embeddings[0]))
     faiss.normalize_L2(np.array(embeddings))
 
@@ -115,12 +126,50 @@ def create_store(doc_source: DocSource, ai: AI, chunks: List[str]) -> None:
     faiss.write_index(index, writer)
     del writer
     doc_source.save_index(buffer.getvalue())
+    return True
+
+
+class IndexCache:
+    """LRU cache of deserialized indexes, keyed by doc_id.
+
+    Entries remember the index file's mtime so an index rebuilt by another
+    worker is reloaded instead of served stale.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, Tuple[int, faiss.Index]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, doc_source: DocSource) -> faiss.Index:
+        doc_id = doc_source.doc_path.name
+        mtime = (doc_source.doc_path / doc_source.index_file_name).stat().st_mtime_ns
+        with self.lock:
+            entry = self.entries.get(doc_id)
+            if entry is not None and entry[0] == mtime:
+                self.entries.move_to_end(doc_id)
+                return entry[1]
+
+        buffer = doc_source.read_index()
+        reader = faiss.PyCallbackIOReader(io.BytesIO(buffer).read)
+        index = faiss.read_index(reader)
+        with self.lock:
+            self.entries[doc_id] = (mtime, index)
+            self.entries.move_to_end(doc_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return index
+
+    def evict(self, doc_id: str) -> None:
+        with self.lock:
+            self.entries.pop(doc_id, None)
+
+
+index_cache = IndexCache(index_cache_size)
 
 
 def query_item(doc_source: DocSource, ai: AI, query: str) -> [(str, str)]:
-    buffer = doc_source.read_index()
-    reader = faiss.PyCallbackIOReader(io.BytesIO(buffer).read)
-    index = faiss.read_index(reader)
+    index = index_cache.get(doc_source)
     query_embedding = ai.encode(query)
     faiss.normalize_L2(np.array([query_embedding]))
     distances, anns = index.search(np.array([query_embedding]), k=k)
@@ -138,3 +187,71 @@ def query_item(doc_source: DocSource, ai: AI, query: str) -> [(str, str)]:
     answer, sources = parse_ai_answer(ai_answer)
 
     return answer, [chunks[chunk_id] for chunk_id in sources]
+
+
+def remove_doc_path(doc_path: Path) -> int:
+    """Remove a document directory and return the number of bytes freed."""
+    index_cache.evict(doc_path.name)
+    if (
+        not doc_id_pattern.fullmatch(doc_path.name)
+        or doc_path.resolve().parent != data_root_path.resolve()
+    ):
+        logger.error(f"Refusing to remove {doc_path}, it is not a document directory")
+        return 0
+    if not doc_path.is_dir():
+        return 0
+
+    freed = 0
+    for root, dirs, files in os.walk(doc_path, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                # removed concurrently, e.g. by a cancelled ingestion task
+                continue
+            except OSError:
+                logger.exception(f"Failed to remove {path}")
+                continue
+            freed += size
+        for name in dirs:
+            path = os.path.join(root, name)
+            try:
+                os.rmdir(path)
+            except OSError:
+                logger.exception(f"Failed to remove {path}")
+    try:
+        doc_path.rmdir()
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logger.exception(f"Failed to remove {doc_path}")
+    return freed
+
+
+def compact_data_root(db_path: Path, data_root_path: Path, active: Set[str]) -> int:
+    """Remove document directories that no longer have a row in the docs table.
+
+    Only directories named like a doc_id are considered, anything else under
+    the data root is left alone.
+
+    Directories of documents in ``active`` (ingestion still running) are kept.
+    Returns the number of bytes freed.
+    """
+    # scan before reading the docs table: rows are inserted before their
+    # directory is created, so every directory seen here that belongs to a
+    # live document already has its row
+    with os.scandir(data_root_path) as entries:
+        candidates = [
+            Path(entry.path)
+            for entry in entries
+            if entry.is_dir(follow_symlinks=False) and doc_id_pattern.fullmatch(entry.name)
+        ]
+    known = Doc.get_all_doc_ids(db_path) | active
+    orphans = [path for path in candidates if path.name not in known]
+    freed = 0
+    for orphan in orphans:
+        freed += remove_doc_path(orphan)
+    logger.info(f"Compaction removed {len(orphans)} orphaned directories, freed {freed} bytes")
+    return freed
@@ -1,5 +1,6 @@
 import os
 import pathlib
+from typing import Optional
 
 
 db_name: str = "test.db"
@@ -19,3 +20,17 @@ min_characters: int = 100
 max_characters: int = 500
 k: int = 5
 threshold: float = 300
+
+# minimum seconds between two sweeps for orphaned document directories
+compaction_interval_s: float = 600
+
+# when set, workers encode through the embedding service listening on this
+# unix socket instead of loading the model themselves (see api/embedding_service.py)
+embedding_socket_path: Optional[str] = os.environ.get("EMBEDDING_SOCKET_PATH")
+embedding_max_batch_size: int = 32
+embedding_max_batch_wait_ms: float = 5
+# seconds a worker waits on the embedding service before giving up
+embedding_timeout_s: float = 30
+
+# deserialized faiss indexes kept in memory per worker
+index_cache_size: int = 32
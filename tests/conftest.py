@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+
+# config reads these at import time, so set them before anything imports it
+os.environ["DATA_ROOT_PATH"] = tempfile.mkdtemp(prefix="doc_search_test_")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("API_KEY", "test")
+# workers only connect to the embedding service on first encode, so the model
+# is never loaded in tests
+os.environ["EMBEDDING_SOCKET_PATH"] = os.path.join(
+    os.environ["DATA_ROOT_PATH"], ".embed.sock"
+)
+
+import calendar
+import time
+
+import pytest
+
+from config import data_root_path, db_path
+from api import models
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(os.environ["DATA_ROOT_PATH"], ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def data_root():
+    for entry in data_root_path.iterdir():
+        if entry.is_dir():
+            shutil.rmtree(entry)
+        else:
+            entry.unlink()
+    models.create_tables(db_path)
+    return data_root_path
+
+
+@pytest.fixture
+def add_dir(data_root):
+    def add(name: str, files: dict) -> None:
+        path = data_root / name
+        path.mkdir()
+        for file_name, content in files.items():
+            (path / file_name).write_bytes(content)
+
+    return add
+
+
+@pytest.fixture
+def add_doc(add_dir):
+    def add(doc_id: str, files: dict = None) -> None:
+        now = calendar.timegm(time.gmtime())
+        models.Doc(
+            doc_name="doc.pdf",
+            doc_type="application/pdf",
+            uid=1,
+            file_size=1,
+            doc_id=doc_id,
+            create_at=now,
+            update_at=now,
+        ).save_db(db_path)
+        if files:
+            add_dir(doc_id, files)
+
+    return add
@@ -0,0 +1,99 @@
+import threading
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from config import db_path
+from api import app as app_module
+from api import models
+
+client = TestClient(app_module.app)
+headers = {"x-api-key": "test"}
+doc_a = "ch_" + "a" * 32
+doc_b = "ch_" + "b" * 32
+
+
+@pytest.mark.parametrize("source_id", ["", ".", "..", "../data", "ch_a", "CH_" + "A" * 32])
+def test_delete_rejects_invalid_ids(data_root, add_doc, source_id):
+    add_doc(doc_a, {"data.txt": b"x"})
+
+    response = client.post(
+        "/v1/sources/delete", json={"sources": [source_id]}, headers=headers
+    )
+
+    assert response.status_code == 400
+    assert models.Doc.exists_with_doc_id(db_path, doc_a)
+    assert (data_root / doc_a / "data.txt").exists()
+
+
+def test_delete_validates_all_ids_before_deleting(data_root, add_doc):
+    add_doc(doc_a, {"data.txt": b"x"})
+
+    response = client.post(
+        "/v1/sources/delete", json={"sources": [doc_a, ""]}, headers=headers
+    )
+
+    assert response.status_code == 400
+    assert models.Doc.exists_with_doc_id(db_path, doc_a)
+    assert (data_root / doc_a).is_dir()
+
+
+def test_delete_removes_artifacts(data_root, add_doc):
+    add_doc(doc_a, {"data.txt": b"x" * 10, "index.faiss": b"y" * 4})
+    add_doc(doc_b, {"data.txt": b"x"})
+
+    response = client.post(
+        "/v1/sources/delete", json={"sources": [doc_a]}, headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.json()["bytes_freed"] == 14
+    assert not models.Doc.exists_with_doc_id(db_path, doc_a)
+    assert not (data_root / doc_a).exists()
+    assert (data_root / doc_b).is_dir()
+
+
+class DeletingAI:
+    """Deletes the docs row on the second encode, like a delete in another worker."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text):
+        self.calls += 1
+        if self.calls == 2:
+            models.Doc.delete_with_doc_id(db_path, doc_a)
+        return np.ones(4, dtype=np.float32)
+
+
+def test_file_task_stops_when_deleted_during_indexing(data_root, add_doc, monkeypatch):
+    add_doc(doc_a)
+    ai = DeletingAI()
+    monkeypatch.setattr(app_module, "ai", ai)
+    monkeypatch.setattr(
+        app_module.utils, "process_doc", lambda doc_source, data: ["one", "two", "three", "four"]
+    )
+
+    app_module.file_task(doc_a, "doc.pdf", b"%PDF", threading.Event())
+
+    assert ai.calls == 2
+    assert not (data_root / doc_a).exists()
+
+
+def test_compaction_is_debounced(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "last_compaction", None)
+    monkeypatch.setattr(
+        app_module.utils, "compact_data_root", lambda *args: calls.append(args) or 0
+    )
+
+    app_module.compact_task()
+    app_module.compact_task()
+
+    assert len(calls) == 1
+    monkeypatch.setattr(
+        app_module, "last_compaction", app_module.last_compaction - app_module.compaction_interval_s
+    )
+    app_module.compact_task()
+    assert len(calls) == 2
@@ -0,0 +1,167 @@
+import asyncio
+import contextlib
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from api.embedding_service import EmbeddingService, RemoteEmbedder, remove_stale_socket
+
+
+class FakeModel:
+    """Embeds text as [len(text), index in batch] and records batch sizes."""
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.batches = []
+
+    def encode(self, texts, batch_size):
+        self.batches.append(len(texts))
+        time.sleep(self.delay)
+        return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+
+@pytest.fixture
+def socket_path():
+    # unix socket paths are limited to ~100 characters, keep it short
+    directory = tempfile.mkdtemp(prefix="emb_")
+    yield os.path.join(directory, "s.sock")
+    shutil.rmtree(directory)
+
+
+@pytest.fixture
+def running_service(socket_path):
+    model = FakeModel(delay=0.05)
+    service = EmbeddingService(model, max_batch_size=8, max_batch_wait_ms=20)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(service.serve(socket_path))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.01)
+    yield model
+
+    async def stop():
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_remote_embedder_round_trip(socket_path, running_service):
+    embedder = RemoteEmbedder(socket_path, timeout=5)
+
+    embedding = embedder.encode("héllo")
+
+    assert embedding.dtype == np.float32
+    assert embedding.tolist() == [5.0, 0.0]
+    assert os.stat(socket_path).st_mode & 0o777 == 0o600
+
+
+def test_concurrent_requests_are_batched(socket_path, running_service):
+    embedder = RemoteEmbedder(socket_path, timeout=5)
+    texts = ["a" * n for n in range(1, 9)]
+
+    with ThreadPoolExecutor(len(texts)) as pool:
+        embeddings = list(pool.map(embedder.encode, texts))
+
+    assert [e[0] for e in embeddings] == [float(len(t)) for t in texts]
+    assert sum(running_service.batches) == len(texts)
+    assert max(running_service.batches) > 1
+
+
+def test_lone_request_skips_batch_window():
+    service = EmbeddingService(FakeModel(), max_batch_size=8, max_batch_wait_ms=1000)
+
+    async def run():
+        await service.queue.put(("a", None))
+        start = time.monotonic()
+        batch = await service.next_batch()
+        return batch, time.monotonic() - start
+
+    batch, elapsed = asyncio.run(run())
+
+    assert len(batch) == 1
+    assert elapsed < 0.5
+
+
+def test_queued_requests_form_one_batch():
+    service = EmbeddingService(FakeModel(), max_batch_size=3, max_batch_wait_ms=10)
+
+    async def run():
+        for text in "abcd":
+            await service.queue.put((text, None))
+        return await service.next_batch()
+
+    assert [text for text, _ in asyncio.run(run())] == ["a", "b", "c"]
+
+
+def test_cancelled_waiter_does_not_stop_batching():
+    service = EmbeddingService(FakeModel(), max_batch_size=8, max_batch_wait_ms=10)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        cancelled, live = loop.create_future(), loop.create_future()
+        cancelled.cancel()
+        worker = asyncio.create_task(service.run_batches())
+        await service.queue.put(("a", cancelled))
+        await service.queue.put(("bb", live))
+        result = await asyncio.wait_for(live, 1)
+        assert not worker.done()
+        worker.cancel()
+        return result
+
+    assert np.frombuffer(asyncio.run(run()), dtype="<f4").tolist() == [2.0, 1.0]
+
+
+def test_remove_stale_socket(socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    remove_stale_socket(socket_path)
+
+    assert not os.path.exists(socket_path)
+
+
+def test_live_socket_is_not_taken_over(socket_path, running_service):
+    with pytest.raises(RuntimeError):
+        remove_stale_socket(socket_path)
+    assert RemoteEmbedder(socket_path, timeout=5).encode("ab").tolist() == [2.0, 0.0]
+
+
+def test_stalled_service_times_out(socket_path):
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    try:
+        embedder = RemoteEmbedder(socket_path, timeout=0.1)
+        with pytest.raises(OSError):
+            embedder.encode("a")
+    finally:
+        server.close()
+
+
+def test_worker_disconnect_does_not_leak_errors(socket_path, running_service, caplog):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    # the response is written after the worker is gone, like a killed worker
+    sock.sendall(struct.pack(">I", 1) + b"a")
+    sock.close()
+
+    assert RemoteEmbedder(socket_path, timeout=5).encode("ab").tolist() == [2.0, 0.0]
+    time.sleep(0.1)
+    assert "Unhandled exception" not in caplog.text
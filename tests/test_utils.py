@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from config import db_path
+from api import utils
+from api.models import DocSource
+
+
+def test_compact_keeps_known_and_removes_orphans(data_root, add_doc, add_dir):
+    add_doc("ch_" + "a" * 32, {"data.txt": b"x" * 10})
+    add_dir("ch_" + "b" * 32, {"data.txt": b"x" * 20, "index.faiss": b"y" * 5})
+    add_dir("ch_" + "c" * 32, {"doc.pdf": b"z" * 7})
+
+    freed = utils.compact_data_root(db_path, data_root, {"ch_" + "c" * 32})
+
+    assert freed == 25
+    assert (data_root / ("ch_" + "a" * 32)).is_dir()
+    assert not (data_root / ("ch_" + "b" * 32)).exists()
+    assert (data_root / ("ch_" + "c" * 32)).is_dir()
+    assert db_path.exists()
+
+
+def test_compact_leaves_non_document_directories(data_root, add_dir):
+    add_dir("backups", {"test.db.bak": b"x" * 10})
+    add_dir("CH_" + "a" * 32, {"data.txt": b"x"})
+
+    assert utils.compact_data_root(db_path, data_root, set()) == 0
+    assert (data_root / "backups" / "test.db.bak").exists()
+    assert (data_root / ("CH_" + "a" * 32)).is_dir()
+
+
+def test_remove_doc_path_counts_removed_bytes(data_root, add_dir):
+    add_dir("ch_" + "a" * 32, {"data.txt": b"x" * 10, "index.faiss": b"y" * 3})
+
+    assert utils.remove_doc_path(data_root / ("ch_" + "a" * 32)) == 13
+    assert not (data_root / ("ch_" + "a" * 32)).exists()
+    assert utils.remove_doc_path(data_root / ("ch_" + "a" * 32)) == 0
+
+
+def test_remove_doc_path_refuses_paths_outside_data_root(data_root, add_dir):
+    add_dir("ch_" + "a" * 32, {"data.txt": b"x"})
+
+    assert utils.remove_doc_path(data_root) == 0
+    assert utils.remove_doc_path(data_root / "") == 0
+    assert utils.remove_doc_path(data_root / ("ch_" + "a" * 32) / "..") == 0
+    add_dir("backups", {"test.db.bak": b"x"})
+    assert utils.remove_doc_path(data_root / "backups") == 0
+    assert (data_root / "backups" / "test.db.bak").exists()
+    assert (data_root / ("ch_" + "a" * 32) / "data.txt").exists()
+    assert db_path.exists()
+
+
+class VectorAI:
+    """Encodes chunk "i" as vectors[i]."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, text):
+        return self.vectors[int(text)]
+
+
+def build_index(doc_source, vectors):
+    ai = VectorAI(vectors)
+    chunks = [str(i) for i in range(len(vectors))]
+    doc_source.save_data("\n".join(chunks))
+    assert utils.create_store(doc_source, ai, chunks, lambda: False)
+
+
+def test_index_cache_reloads_rebuilt_index(data_root):
+    doc_source = DocSource(doc_path=data_root / ("ch_" + "a" * 32), file_name="doc.pdf")
+    cache = utils.IndexCache(max_size=2)
+    build_index(doc_source, [np.ones(4, dtype=np.float32)])
+
+    first = cache.get(doc_source)
+    assert cache.get(doc_source) is first
+
+    build_index(doc_source, [np.ones(4, dtype=np.float32)] * 3)
+    index_path = doc_source.doc_path / doc_source.index_file_name
+    stat = index_path.stat()
+    os.utime(index_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    rebuilt = cache.get(doc_source)
+    assert rebuilt is not first
+    assert rebuilt.ntotal == 3
+
+
+def test_index_cache_evicts(data_root, monkeypatch):
+    cache = utils.IndexCache(max_size=1)
+    sources = [
+        DocSource(doc_path=data_root / ("ch_" + c * 32), file_name="doc.pdf")
+        for c in "ab"
+    ]
+    for doc_source in sources:
+        build_index(doc_source, [np.ones(4, dtype=np.float32)])
+
+    cache.get(sources[0])
+    cache.get(sources[1])
+    assert list(cache.entries) == [sources[1].doc_path.name]
+
+    monkeypatch.setattr(utils, "index_cache", cache)
+    utils.remove_doc_path(sources[1].doc_path)
+    assert not cache.entries